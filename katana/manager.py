@@ -2,11 +2,13 @@
 """ A katana manager which is capable managing the evaluation of arbitrary
 units against an arbitrary number of Targets of varying types in a
 multithreaded manner and reporting results to a Monitor object """
-from dataclasses import dataclass, field
-from typing import List, Any, Generator, Dict, Callable, Tuple
+from dataclasses import dataclass
+from typing import List, Any, Generator, Dict, Callable, Tuple, Iterable
 import configparser
+import itertools
 import threading
 import queue
+import random
 import time
 import os
 import regex as re
@@ -20,6 +22,56 @@ from katana.unit import Unit, Finder
 from katana.monitor import Monitor
 import katana.util
 
+# Matches XML/HTML tags, which are stripped from data before searching for flags
+_XML_RE = re.compile(b"<[^<]+>")
+# Matches a regular expression quantifier such as "{3}" or "{2,5}". An empty
+# "{}" is not a quantifier, and matches literally.
+_QUANTIFIER_RE = re.compile(r"\{(?:\d+(?:,\d*)?|,\d*)\}")
+# Matches runs of ASCII characters which are not affected by IGNORECASE
+_CASELESS_RE = re.compile(r"[\x00-\x40\x5b-\x60\x7b-\x7f]+")
+
+
+def _flag_literal(flag_format: str) -> bytes:
+    """ Find a literal which must appear in any data matching the (case
+    insensitive) flag format. This is the longest run of non-letters in the
+    literal prefix of the format, e.g. "{" for "FLAG{.*?}". An empty result
+    means no such literal could be found. """
+
+    # Alternation could make any prefix optional, and inline groups (flags or
+    # comments) can change how the characters before them are matched
+    if "|" in flag_format or "(?" in flag_format:
+        return b""
+
+    prefix = ""
+    i = 0
+    while i < len(flag_format):
+        c = flag_format[i]
+        size = 1
+
+        if c == "\\" and i + 1 < len(flag_format) and not flag_format[i + 1].isalnum():
+            # Escaped punctuation is a literal
+            c = flag_format[i + 1]
+            size = 2
+        elif c == "{" and _QUANTIFIER_RE.match(flag_format, i) is None:
+            # Braces are literal unless they form a quantifier
+            pass
+        elif c in "\\.^$*+?{}[]()":
+            break
+
+        # A quantified character may not appear in the flag
+        following = flag_format[i + size : i + size + 1]
+        if following in ("*", "+", "?") or _QUANTIFIER_RE.match(flag_format, i + size):
+            break
+
+        prefix += c
+        i += size
+
+    runs = _CASELESS_RE.findall(prefix)
+    if not runs:
+        return b""
+
+    return max(runs, key=len).encode("utf-8")
+
 
 @dataclass
 class Download(object):
@@ -37,24 +89,60 @@ class Download(object):
     completed: bool
 
 
+class WorkQueue(queue.PriorityQueue):
+    """ A priority queue which can add many items while only acquiring its
+    lock once """
+
+    def put_many(self, items: List[Any]) -> None:
+        """ Put all of the given items in the queue without blocking """
+
+        with self.not_full:
+            for item in items:
+                self._put(item)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify(len(items))
+
+
 class Manager(configparser.ConfigParser):
     """ Class to manage the threaded evaluation of applicable units against
     arbitrary targets. Facilitates work queue management and recursion within
     given units. It will also manage output file creation (such as artifacts).
     """
 
-    @dataclass(order=True)
+    @dataclass(eq=False)
     class WorkItem(object):
         """ Defines the items that are actually placed in the work queue. The
         work queue maintains the state of the case generator and priority for
         the unit. Priority is taken directly from the unit. `generator` is the
-        result of `unit.evaluate` and will be called when the first thread
-        begins evaluating the unit. """
+        result of `unit.enumerate`, and cases are taken from it by whichever
+        thread dequeues the item. `batch` is the number of cases taken from
+        the generator the next time this item is dequeued. `in_flight` counts
+        the batches currently being evaluated, and `drained` is set once the
+        generator is exhausted. The unit is removed from its target after the
+        last batch of a drained item finishes.
+
+        Items are queued as ``(priority, sequence, item)`` tuples, so the
+        queue compares plain numbers and never the item itself. """
 
         priority: float
-        action: str = field(compare=False)
-        unit: Unit = field(compare=False)
-        generator: Generator[Any, None, None] = field(compare=False)
+        unit: Unit
+        generator: Generator[Any, None, None]
+        batch: int = 2
+        in_flight: int = 0
+        drained: bool = False
+
+    MAX_STEAL = 16
+    """ The maximum number of extra work items an idle thread will steal from
+    another thread's queue at once """
+
+    MAX_BATCH = 64
+    """ The maximum number of cases evaluated each time a work item is
+    dequeued. Batches start small and double each time a unit is requeued. """
+
+    MAX_QUEUE = 8
+    """ The maximum number of units `Manager.queue_many` holds back before
+    pushing them to the work queue. Units are pushed right away while any
+    thread is idle. """
 
     def __init__(self, monitor: Monitor = None, config_path=None, default_units=True):
 
@@ -80,6 +168,7 @@ class Manager(configparser.ConfigParser):
             "prioritize": True,
             "default-units": True,
             "max-depth": 10,
+            "pin-threads": False,
         }
 
         if "manager" not in self:
@@ -104,15 +193,30 @@ class Manager(configparser.ConfigParser):
 
         # Create the unit finder for matching targets to units
         self.finder = Finder(self, use_default=default_units)
-        # This is the work queue
-        self.work = queue.PriorityQueue()
-        # This is the barrier which signals wait on and signals completion of
-        # evaluation. It is initialized in the `start` method
-        self.barrier: threading.Barrier = None
+        # These are the work queues. Each thread owns one shard (created in
+        # `start`) and steals from the others when its own shard is empty.
+        self.work_shards: List[WorkQueue] = [WorkQueue()]
+        # Next shard used by threads which don't own one (e.g. the main thread)
+        self._push_idx = 0
+        # Breaks ties between queued items of equal priority
+        self._sequence = itertools.count()
+        # Holds the shard index owned by each worker thread
+        self._local = threading.local()
+        # Idle threads wait on `_work_available` until work is queued, and
+        # `join` waits on `_all_idle` until every thread is idle. Both share
+        # the lock protecting `_idle_threads`.
+        idle_lock = threading.Lock()
+        self._work_available = threading.Condition(idle_lock)
+        self._all_idle = threading.Condition(idle_lock)
+        self._idle_threads = 0
+        # Set to ask the threads to exit
+        self._shutting_down = threading.Event()
         # Array of threads (also initialized in `start`)
         self.threads = []
         # Flag pattern will be compiled upon running `start`
         self.flag_pattern = None
+        # Compiled flag patterns and literals for each flag format
+        self._flag_patterns: Dict[str, Tuple[Any, bytes]] = {}
 
         # This is dumb, and I don't know why we need it
         if "flag-format" in self["manager"]:
@@ -132,6 +236,9 @@ class Manager(configparser.ConfigParser):
         # Downloads that are in progress
         self.downloads: List[Download] = []
 
+        # Cache configuration values used on the hot path
+        self._reload_config()
+
     def set(self, section: str, option: str, value: Any = None) -> None:
         """ Wrapper around ConfigParser.set. We need to take into account some special
         configs which require other things to be accounted for (e.g. flag_format for
@@ -151,7 +258,17 @@ class Manager(configparser.ConfigParser):
                 # We cannot modify the thread count after starting the manager
                 return
 
-        return super(Manager, self).set(section, option, value)
+        super(Manager, self).set(section, option, value)
+
+        # Keep the cached values in sync with interactive changes
+        if self.running:
+            self._reload_config()
+
+    def _reload_config(self) -> None:
+        """ Refresh configuration values which are cached as attributes to
+        avoid configparser lookups for every result. """
+
+        self._min_data = self["manager"].getint("min-data")
 
     def download(
         self,
@@ -232,14 +349,14 @@ class Manager(configparser.ConfigParser):
         self.monitor.on_artifact(self, unit, path)
 
         # Recurse on this target
-        if unit.target.config["manager"].getboolean("recurse") and recurse:
+        if unit.target.recurse and recurse:
             self.queue_target(path, parent=unit)
 
     def register_data(self, unit: Unit, data: Any, recurse: bool = True) -> None:
         """ Register arbitrary data results with the manager """
 
         # Sometimes units do weird things
-        if len(data) < int(self["manager"]["min-data"]):
+        if len(data) < self._min_data:
             return
 
         # Notify the monitor of the data
@@ -248,8 +365,8 @@ class Manager(configparser.ConfigParser):
         # Look for flagsregister
         self.find_flag(unit, data)
 
-        if unit.target.config["manager"].getboolean("recurse") and recurse:
-            # Only do full recursion if requested
+        # Only do full recursion if requested, and the flag wasn't just found
+        if unit.target.recurse and recurse and not unit.origin.completed:
             self.queue_target(data, parent=unit)
 
     def register_flag(self, unit: Unit, flag: str) -> None:
@@ -267,57 +384,138 @@ class Manager(configparser.ConfigParser):
         """ Search arbitrary data for flags matching the given flag format in
         the manager configuration """
 
-        # Iterate over lists and tuples automatically
-        if isinstance(data, list) or isinstance(data, tuple):
-            found = 0
-            for item in data:
-                found += self.find_flag(unit, item)
-            return found > 0
-
-        # Iterate over dictionaries
-        if isinstance(data, dict):
-            found = 0
-            for key, item in data.items():
-                found += self.find_flag(unit, item)
-            return found > 0
-
-        # We deal with bytes here
-        if isinstance(data, str):
-            data = data.encode("utf-8")
-
-        # CALEB: this is a hack to remove XML from flags, and check that as
-        # well. It was observed to be needed for some weird XML challenges.
-        no_xml = re.sub(b"<[^<]+>", b"", data)
-        if no_xml != data:
-            self.find_flag(unit, no_xml)
-
-        # Search the data for flags
-        match = re.search(
-            bytes(unit.target.config["manager"]["flag-format"], "utf-8"),
-            data,
-            re.DOTALL | re.MULTILINE | re.IGNORECASE,
-        )
-        if match:
-            # Flags should be printable
-            try:
-                found = match.group().decode("utf-8")
-            except UnicodeDecodeError:
-                pass
-            else:
-                if katana.util.isprintable(found):
-                    # Strict flags means that the flag will be alone in the output
-                    if (
-                        unit is not None
-                        and unit.STRICT_FLAGS
-                        and len(found) == len(data)
-                    ):
-                        self.register_flag(unit, found)
-                        return True
-                    elif unit is None or not unit.STRICT_FLAGS:
-                        self.register_flag(unit, found)
-                        return True
-
-        return False
+        # A flag was already found for this target tree
+        if unit is not None and unit.origin.completed:
+            return False
+
+        pattern, literal = self._get_flag_pattern(unit)
+        found = False
+
+        # Strict flags means that the flag will be alone in the output
+        if unit is not None and unit.STRICT_FLAGS:
+            search = self._find_flag_strict
+        else:
+            search = self._find_flag_loose
+
+        # Lists, tuples and dictionaries are walked with an explicit stack
+        # rather than recursing back into `find_flag` for each item
+        stack = [data]
+        while stack:
+            data = stack.pop()
+
+            # No need to keep looking once a flag completed the target tree
+            if unit is not None and unit.origin.completed:
+                break
+
+            # Iterate over lists and tuples automatically
+            if isinstance(data, (list, tuple)):
+                stack.extend(reversed(data))
+                continue
+
+            # Iterate over dictionaries
+            if isinstance(data, dict):
+                stack.extend(reversed(list(data.values())))
+                continue
+
+            # We deal with bytes here
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+
+            # CALEB: this is a hack to remove XML from flags, and check that as
+            # well. It was observed to be needed for some weird XML challenges.
+            # Data without tags is left alone, and the substitution count is
+            # used rather than comparing the stripped data to the original.
+            # Stripped data is searched first (most stripped first), so a flag
+            # wrapped in tags is reported without them.
+            candidates = [data]
+            while b"<" in data and b">" in data:
+                data, count = _XML_RE.subn(b"", data)
+                if not count:
+                    break
+                candidates.append(data)
+
+            for data in reversed(candidates):
+
+                # Skip the regular expression if the flag can't be present
+                if literal and literal not in data:
+                    continue
+
+                # Search the data for flags
+                if search(unit, pattern, data):
+                    found = True
+
+                if unit is not None and unit.origin.completed:
+                    break
+
+        return found
+
+    def _find_flag_loose(self, unit: Unit, pattern: Any, data: bytes) -> bool:
+        """ Register every valid flag found anywhere in the data, until the
+        target tree is completed """
+
+        found = False
+
+        for match in pattern.finditer(data):
+            flag = self._flag_from_match(match)
+            if flag is None:
+                continue
+
+            self.register_flag(unit, flag)
+            found = True
+
+            if unit is not None and unit.origin.completed:
+                break
+
+        return found
+
+    def _find_flag_strict(self, unit: Unit, pattern: Any, data: bytes) -> bool:
+        """ Register the data as a flag only if the entire data matches the
+        flag format """
+
+        flag = self._flag_from_match(pattern.fullmatch(data))
+        if flag is None:
+            return False
+
+        self.register_flag(unit, flag)
+        return True
+
+    def _flag_from_match(self, match: Any) -> str:
+        """ Return the flag for a flag pattern match, or None if there was no
+        match or the flag is not printable """
+
+        if match is None:
+            return None
+
+        # Flags should be printable
+        try:
+            flag = match.group().decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+        if not katana.util.isprintable(flag):
+            return None
+
+        return flag
+
+    def _get_flag_pattern(self, unit: Unit) -> Tuple[Any, bytes]:
+        """ Return the compiled flag pattern for the given unit's target
+        configuration, along with a literal which any flag must contain (see
+        `_flag_literal`). These are computed once per flag format. """
+
+        if unit is None:
+            flag_format = self["manager"]["flag-format"]
+        else:
+            flag_format = unit.target.config["manager"]["flag-format"]
+
+        try:
+            return self._flag_patterns[flag_format]
+        except KeyError:
+            pattern = re.compile(
+                bytes(flag_format, "utf-8"), re.IGNORECASE | re.MULTILINE | re.DOTALL
+            )
+            result = (pattern, _flag_literal(flag_format))
+            self._flag_patterns[flag_format] = result
+            return result
 
     def target(
         self,
@@ -363,7 +561,7 @@ class Manager(configparser.ConfigParser):
             upstream = repr(upstream)
 
         # That's silly...
-        if upstream.strip() == b"" or upstream.strip() == "":
+        if not upstream or not upstream.strip():
             return None
 
         # Don't recurse if the parent is already done
@@ -373,9 +571,7 @@ class Manager(configparser.ConfigParser):
             if parent.origin.completed:
                 return None
             # Maximum depth reached!
-            if (parent.depth + 1) >= parent.target.config["manager"].getint(
-                "max-depth"
-            ):
+            if (parent.depth + 1) >= parent.target.max_depth:
                 self.monitor.on_depth_limit(self, parent.target, parent)
                 return None
 
@@ -398,12 +594,12 @@ class Manager(configparser.ConfigParser):
             try:
                 target.build_target()
             except BadTarget:
-                target._completed = True
+                target.completed_event.set()
                 return
 
             # Don't requeue targets with the same hash
             if target.hash.hexdigest() in self.target_hash:
-                target._completed = True
+                target.completed_event.set()
                 return
             else:
                 self.target_hash[target.hash.hexdigest()] = target
@@ -417,16 +613,16 @@ class Manager(configparser.ConfigParser):
             if target.completed:
                 return
 
-            # Enumerate valid units
-            for unit in self.finder.match(target, scale=scale):
-                self.queue(unit)
-
-            # Tell the unit we are done adding units
-            target.building = False
+            # Enumerate and queue valid units
+            try:
+                self.queue_many(self.finder.match(target, scale=scale))
+            finally:
+                # Tell the unit we are done adding units
+                target.building = False
 
-            # If we missed this due to `building == True`, set it now
-            if target.units_left <= 0:
-                target.completed = True
+                # If we missed this due to `building == True`, set it now
+                if target.units_left <= 0:
+                    target.completed = True
 
         if background:
             # Queue the target at a later time, so we can continue (e.g. w/ REPL)
@@ -444,26 +640,48 @@ class Manager(configparser.ConfigParser):
         unit will be evaluated based on it's priority the next time a thread is
         free. """
 
-        # Check if we are completed
-        if unit.is_complete():
-            return
+        self.queue_many([unit])
 
-        item = Manager.WorkItem(
-            unit.PRIORITY,  # Unit priority
-            "init",  # Initialization of work item
-            unit,  # The unit itself
-            unit.enumerate(),
-        )  # The generator to get the next case
+    def queue_many(self, units: Iterable[Unit]) -> None:
+        """ Queue all of the given units to be evaluated. This behaves like
+        calling `Manager.queue` for each unit, but the units are added to the
+        work queue in batches as they are produced (see `MAX_QUEUE`). """
 
-        # Increment unit count for target
-        unit.origin.add_unit()
+        items = []
+        for unit in units:
+
+            # Check if we are completed
+            if unit.is_complete():
+                continue
+
+            item = Manager.WorkItem(
+                unit.PRIORITY,  # Unit priority
+                unit,  # The unit itself
+                unit.enumerate(),
+            )  # The generator to get the next case
+
+            items.append(item)
+
+            # Don't keep idle threads waiting on the rest of the units
+            if len(items) >= Manager.MAX_QUEUE or self._idle_threads:
+                self._push_units(items)
+                items = []
+
+        # Queue the remaining items for usage
+        if items:
+            self._push_units(items)
 
-        # Queue the item for usage
-        self.work.put(item)
+    def _push_units(self, items: List[WorkItem]) -> None:
+        """ Count newly created work items against their targets and push
+        them. Units are only counted once they are about to be queued, so an
+        error while producing units can't leave a target waiting on units
+        which were never queued. """
 
-        # Ensure sleeping threads wake up
-        if self.barrier is not None:
-            self.barrier.reset()
+        # Increment unit count for target
+        for item in items:
+            item.unit.origin.add_unit()
+
+        self._push(items)
 
     def requeue(self, item: WorkItem) -> None:
         """ Requeue an item which has more cases left to evaluate """
@@ -472,14 +690,74 @@ class Manager(configparser.ConfigParser):
         if item.unit.is_complete():
             return
 
-        # We aren't initializing anymore
-        # item.action = "evaluate"
-
         # Requeue the item
-        self.work.put(item)
+        self._push([item])
+
+    def qsize(self) -> int:
+        """ Return the approximate number of work items queued across all
+        shards """
+        return sum(shard.qsize() for shard in self.work_shards)
+
+    @property
+    def idle(self) -> bool:
+        """ Whether all threads are waiting for work and none is queued """
+        return self._idle_threads == len(self.threads) and self.qsize() == 0
+
+    def _push(self, items: List[WorkItem]) -> None:
+        """ Place work items in a work queue shard. Worker threads push to
+        their own shard, while other threads distribute items round-robin. """
+
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            self._push_idx = (self._push_idx + 1) % len(self.work_shards)
+            shard = self._push_idx
+
+        self.work_shards[shard].put_many(
+            [(item.priority, next(self._sequence), item) for item in items]
+        )
+
+        # Wake an idle thread for each item. Idle threads check the queues while
+        # holding the lock before waiting, so the unlocked test can't miss one.
+        if self._idle_threads:
+            with self._work_available:
+                self._work_available.notify(len(items))
+
+    def _get_work(self, shard: int) -> WorkItem:
+        """ Grab the next work item for the thread owning the given shard. If
+        the shard is empty, work is stolen from the other shards. Raises
+        ``queue.Empty`` if there is no work in any shard. """
+
+        local = self.work_shards[shard]
+
+        try:
+            return local.get(False)[2]
+        except queue.Empty:
+            pass
+
+        # Visit every other shard, starting with a random victim, so that no
+        # work is left behind before this thread goes idle
+        nshards = len(self.work_shards)
+        first = random.randrange(nshards)
+        for n in range(nshards):
+            victim = self.work_shards[(first + n) % nshards]
+            if victim is local:
+                continue
+
+            try:
+                work = victim.get(False)[2]
+            except queue.Empty:
+                continue
+
+            # Take up to half of the remaining work to our own shard
+            for i in range(min(victim.qsize() // 2, Manager.MAX_STEAL)):
+                try:
+                    local.put(victim.get(False))
+                except queue.Empty:
+                    break
 
-        if self.barrier is not None:
-            self.barrier.reset()
+            return work
+
+        raise queue.Empty
 
     def start(self) -> None:
         """ Start the needed threads and begin evaluation of units. You can
@@ -497,11 +775,16 @@ class Manager(configparser.ConfigParser):
         # Validate the configuration items are valid and there will be no
         # issues moving forward
         self.validate()
+        self._reload_config()
 
-        # Create the barrier object
-        self.barrier = threading.Barrier(self["manager"].getint("threads") + 1)
         self.threads = [None] * self["manager"].getint("threads")
         self.running = True
+        self._shutting_down.clear()
+
+        # One work shard per thread. Anything queued before starting stays in
+        # the first shard and is stolen by the other threads.
+        while len(self.work_shards) < len(self.threads):
+            self.work_shards.append(WorkQueue())
 
         # Start the threads (will automatically begin processing units)
         for n in range(len(self.threads)):
@@ -535,14 +818,15 @@ class Manager(configparser.ConfigParser):
         while True:
 
             try:
-                # Wait for all threads to meet the barrier, which indicates all
-                # unit/case pairs are processed
-                if timeout is not None:
-                    self.barrier.wait(stop_time - time.time())
-                else:
-                    self.barrier.wait()
-            except threading.BrokenBarrierError:
-                pass
+                # Wait for all threads to be idle with nothing queued, which
+                # indicates all unit/case pairs are processed
+                with self._all_idle:
+                    if timeout is not None:
+                        finished = self._all_idle.wait_for(
+                            lambda: self.idle, stop_time - time.time()
+                        )
+                    else:
+                        finished = self._all_idle.wait_for(lambda: self.idle)
             except KeyboardInterrupt:
 
                 # If we have already signaled, and we catch another
@@ -555,10 +839,10 @@ class Manager(configparser.ConfigParser):
                 self._signal_complete()
                 aborting = True
             else:
-                # Just in case, we signal completion, but all threads should
-                # exit when the barrier is reached successfully
-                self._signal_complete()
-                break
+                if finished:
+                    # Everything is processed, ask the threads to exit
+                    self._signal_complete()
+                    break
 
             # Signal completion if our timeout has expired
             if timeout is not None and time.time() >= stop_time:
@@ -571,7 +855,6 @@ class Manager(configparser.ConfigParser):
 
         # Release all threads
         self._signal_complete()
-        self.barrier.reset()
 
         # Wait on all threads to complete
         for thread in self.threads:
@@ -597,58 +880,64 @@ class Manager(configparser.ConfigParser):
         self.monitor.on_completion(self, True)
 
     def _signal_complete(self) -> None:
-        """ Send work items with high priority to signal closing down threads
-        """
+        """ Signal all threads to exit once their current work is done """
 
-        for thread in self.threads:
-            self.work.put(
-                Manager.WorkItem(
-                    -10000, "abort", None, None  # Priority  # Action  # Unit
-                )
-            )  # Generator
+        self._shutting_down.set()
 
-        # Make all the workers wake up and grab these events
-        self.barrier.reset()
+        # Make all the idle workers wake up and notice
+        with self._work_available:
+            self._work_available.notify_all()
 
     def _thread(self, thread) -> None:
         """ This is the main method for each evaluator thread. It will monitor
         the work queue, and evaluate units as they become available. The
         threads are started by the ``Manager.start`` method. """
 
+        # Work queued by this thread goes to its own shard
+        self._local.shard = thread
+
+        # Keep this thread (and its shard) on a single CPU
+        if self["manager"].getboolean("pin-threads"):
+            self._pin_thread(thread)
+
         while True:
 
+            # The parent is asking nicely to exit
+            if self._shutting_down.is_set():
+                break
+
             try:
                 # Attempt to grab work from the queue
-                work: Manager.WorkItem = self.work.get(False)
+                work: Manager.WorkItem = self._get_work(thread)
             except queue.Empty:
-                try:
-                    # Signal this thread is waiting for work
-                    # check again every 0.2 seconds, just in case
-                    self.monitor.on_work(self, thread, None, None)
-                    self.barrier.wait()
-                except threading.BrokenBarrierError:
-                    # A new unit was queued or the timeout happened
-                    # Check for new units
-                    continue
-                else:
-                    # All threads hit the barrier, we are free to exit
-                    break
+                # Signal this thread is waiting for work
+                self.monitor.on_work(self, thread, None, None)
 
-            # The parent is asking nicely to exit
-            if work.action == "abort":
-                self.work.task_done()
-                break
+                with self._work_available:
+                    self._idle_threads += 1
+
+                    # Let `join` know if everything is processed
+                    if self._idle_threads == len(self.threads):
+                        self._all_idle.notify_all()
+
+                    # Sleep until work is queued. Check again every 0.2
+                    # seconds, just in case
+                    if self.qsize() == 0 and not self._shutting_down.is_set():
+                        self._work_available.wait(0.2)
+
+                    self._idle_threads -= 1
 
-            # Ignore the unit if it is already completed
-            if work.unit.is_complete():
-                work.unit.origin.rem_unit()
-                self.work.task_done()
                 continue
 
-            # if work.action == "init":
-            # This is the first time the unit has run, so we need to
-            # initialize the generator for cases
-            #    work.generator = work.unit.enumerate()
+            # These are used for every case below
+            unit = work.unit
+            origin = unit.origin
+            origin_completed = origin.completed_event.is_set
+
+            # Ignore the unit if it is already completed
+            if unit.completed or origin_completed():
+                origin.rem_unit()
+                continue
 
             # We have a unit to process, grab the next case
             cases = []
@@ -660,7 +949,7 @@ class Manager(configparser.ConfigParser):
             # unit off the queue while this one is gone)
             with self.lock:
                 try:
-                    for i in range(10):
+                    for i in range(work.batch):
                         try:
                             case = next(work.generator)
                         except StopIteration:
@@ -668,37 +957,63 @@ class Manager(configparser.ConfigParser):
                             break
                         cases.append(case)
                 except Exception as e:
-                    self.monitor.on_exception(self, work.unit, e)
-                    self.work.task_done()
+                    self.monitor.on_exception(self, unit, e)
                     continue
 
+                # Track this batch until it is evaluated
+                work.in_flight += 1
+                work.drained = empty
+
                 # Before we evaluate, place this case back on the queue in order to
-                # allow parallel processing of the cases
+                # allow parallel processing of the cases. Units with many cases
+                # take larger batches to reduce queue traffic.
                 if not empty:
+                    work.batch = min(work.batch * 2, Manager.MAX_BATCH)
                     self.requeue(work)
 
             for case in cases:
+                # The target was completed (e.g. a flag was found), skip the rest.
+                # Draining the generator doesn't complete the target while
+                # batches are in flight, so no pending cases are dropped here.
+                if origin_completed():
+                    break
+
                 # Notify the monitor of thread status (this should be a very short
                 # call because it can easily slow down processing!!!)
-                self.monitor.on_work(self, thread, work.unit, case)
+                self.monitor.on_work(self, thread, unit, case)
 
                 try:
                     # Evaluate this case
-                    work.unit.evaluate(case)
+                    unit.evaluate(case)
                 except Exception as e:
                     # We got an exception, notify the monitor and continue
-                    self.monitor.on_exception(self, work.unit, e)
+                    self.monitor.on_exception(self, unit, e)
 
                 # Statistics
-                work.unit.origin.units_evaluated += 1
-                if work.unit.target is not work.unit.origin:
-                    work.unit.target.units_evaluated += 1
+                origin.units_evaluated += 1
+                if unit.target is not origin:
+                    unit.target.units_evaluated += 1
                 self.cases_completed += 1
 
-            if empty:
-                work.unit.origin.rem_unit()
+            # Other threads may still be evaluating earlier batches of this
+            # item, so only the last batch out completes the unit
+            with self.lock:
+                work.in_flight -= 1
+                done = work.drained and work.in_flight == 0
 
-            self.work.task_done()
+            if done:
+                origin.rem_unit()
+
+    def _pin_thread(self, thread: int) -> None:
+        """ Pin the calling thread to one of the CPUs available to this
+        process, chosen by thread index. This is best-effort, and does nothing
+        on platforms without ``os.sched_setaffinity``. """
+
+        try:
+            cpus = sorted(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cpus[thread % len(cpus)]})
+        except (AttributeError, OSError):
+            pass
 
     def _prepare_results(self) -> None:
         """ Prepare the results directory to house all artifacts and results
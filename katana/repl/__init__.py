@@ -384,7 +384,7 @@ class Repl(cmd2.Cmd):
     def generate_prompt(self, about_to_wait=False):
 
         # build a dynamic state
-        if self.manager.barrier.n_waiting == len(self.manager.threads) or about_to_wait:
+        if self.manager.idle or about_to_wait:
             state = f"{Fore.YELLOW}waiting{Style.RESET_ALL}"
         else:
             state = f"{Fore.GREEN}running{Style.RESET_ALL}"
@@ -436,7 +436,7 @@ class Repl(cmd2.Cmd):
         # update the prompt
         prompt = (
             f"{Fore.CYAN}katana{Style.RESET_ALL} - {state} - {download_state}"
-            f"{Fore.BLUE}{self.manager.work.qsize()} units queued{Style.RESET_ALL} "
+            f"{Fore.BLUE}{self.manager.qsize()} units queued{Style.RESET_ALL} "
             f"\n{Fore.GREEN}➜ {Style.RESET_ALL}"
         )
 
@@ -461,12 +461,12 @@ class Repl(cmd2.Cmd):
 
         # Figure out the basic status
         basic_status = f"{Fore.YELLOW}waiting{Style.RESET_ALL}"
-        if self.manager.work.qsize() > 0:
+        if self.manager.qsize() > 0:
             basic_status = f"{Fore.GREEN}running{Style.RESET_ALL}"
 
         # Find the number of items queued
         items_queued = (
-            f"{Fore.WHITE}{self.manager.work.qsize()} units queued{Style.RESET_ALL}"
+            f"{Fore.WHITE}{self.manager.qsize()} units queued{Style.RESET_ALL}"
         )
 
         # Find total number of unit cases evaluated
@@ -19,6 +19,7 @@ import mmap
 import regex as re
 import os
 import time
+import threading
 import configparser
 
 
@@ -77,6 +78,7 @@ class Target(object):
     :property is_base64: Whether the data looks like base64
     :property path: The path to a file-backed target (URLs are also file-backed by an artifact)
     :property completed: Whether we are done processing this target
+    :property completed_event: A threading.Event which is set once this target is completed
     :property url_pieces: A regex Match object containing the URL pieces, if this is a URL.
     :property is_url: True if this appears to be a valid URL
     :property is_file: True if this appears to be a valid file path. This is also true, if ``manager[download]`` is
@@ -86,6 +88,8 @@ class Target(object):
     :property start_time: The time in seconds that this target was started
     :property end_time: When this target completed
     :property units_evaluated: The total number of units evaluated under this target (only root targets)
+    :property recurse: Cached ``manager[recurse]`` value from this target's configuration
+    :property max_depth: Cached ``manager[max-depth]`` value from this target's configuration
     
     """
 
@@ -110,7 +114,7 @@ class Target(object):
         self.is_image = False
         self.is_base64 = False
         self.path = False
-        self._completed = False
+        self.completed_event = threading.Event()
         self.start_time = time.time()
         self.end_time = -1
         self.units_evaluated = 0
@@ -128,6 +132,10 @@ class Target(object):
             self.config = configparser.ConfigParser(interpolation=None)
             self.config.read_dict(manager)
 
+        # These are checked for every result, so avoid the configparser lookups
+        self.recurse = self.config["manager"].getboolean("recurse")
+        self.max_depth = self.config["manager"].getint("max-depth")
+
     def build_target(self):
         """ This method does the resource intensive part of building the target. It is done in a separate thread to
         decrease the time to return from the `Manager.queue_target` method (e.g. when running w/ a REPL) """
@@ -313,14 +321,14 @@ class Target(object):
 
     @property
     def completed(self) -> bool:
-        return self._completed
+        return self.completed_event.is_set()
 
     @completed.setter
     def completed(self, value: bool) -> None:
         if not value:
             return
-        self._completed = True
         self.end_time = time.time()
+        self.completed_event.set()
 
     def add_unit(self):
         """ Add a unit for tracking. This is called by Manager.queue """
@@ -17,14 +17,104 @@ https://github.com/tothi/railfence
 
 """
 
-import io
 from typing import Any
-import string
+import threading
 
-from katana.unit import NotEnglishAndPrintableUnit, NotApplicable
+import numpy as np
+
+from katana.unit import NotEnglishAndPrintableUnit
 from katana.units.crypto import CryptoUnit
 
 
+FENCE_CACHE_BYTES = 16 * 1024 * 1024
+"""
+The maximum total size of the fence orders kept by ``fenceOrder``. The oldest
+orders are dropped first, and orders larger than this are never kept.
+"""
+
+_fence_cache = {}
+_fence_cache_lock = threading.Lock()
+
+
+def fenceOrder(length, rails):
+    """
+    Compute the order in which plaintext positions are written to the
+    ciphertext for the Railfence cipher. Recent results are cached (up to
+    ``FENCE_CACHE_BYTES``), as they only depend on the length of the data
+    and the number of rails.
+
+    :param length: The integer length of the (offset) plaintext.
+
+    :param rails: The integer number of rails to use in the Railfence cipher \
+    operations.
+
+    :return: A read-only NumPy ``int32`` array where element ``i`` is the \
+    plaintext position of the ``i``-th ciphertext character.
+    """
+
+    key = (length, rails)
+    with _fence_cache_lock:
+        order = _fence_cache.get(key)
+    if order is not None:
+        return order
+
+    # Each position zig-zags across the rails with this period
+    period = max(2 * (rails - 1), 1)
+    order = np.empty(length, dtype=np.int32)
+
+    # The ciphertext is read rail by rail, left to right. Rails other than the
+    # first and last are visited twice per period, on the way down and up.
+    start = 0
+    for rail in range(rails):
+        positions = np.arange(rail, length, period, dtype=np.int32)
+        if 0 < rail < period - rail:
+            up = np.arange(period - rail, length, period, dtype=np.int32)
+            both = np.empty(len(positions) + len(up), dtype=np.int32)
+            both[0::2] = positions
+            both[1::2] = up
+            positions = both
+        order[start : start + len(positions)] = positions
+        start += len(positions)
+
+    order.setflags(write=False)
+
+    if order.nbytes <= FENCE_CACHE_BYTES:
+        with _fence_cache_lock:
+            _fence_cache[key] = order
+            total = sum(cached.nbytes for cached in _fence_cache.values())
+            while total > FENCE_CACHE_BYTES:
+                oldest = next(iter(_fence_cache))
+                total -= _fence_cache.pop(oldest).nbytes
+
+    return order
+
+
+def fenceScatter(length, rails, offset=0):
+    """
+    Compute the plaintext position of each ciphertext character for the
+    Railfence cipher, skipping the offset padding.
+
+    :param length: The integer length of the ciphertext.
+
+    :param rails: The integer number of rails to use in the Railfence cipher \
+    operations.
+
+    :param offset: The integer offset number to use in the Railfence cipher \
+    operations.
+
+    :return: A read-only NumPy ``int32`` array where element ``i`` is the \
+    plaintext position of the ``i``-th ciphertext character.
+    """
+
+    order = fenceOrder(length + offset, rails)
+
+    if offset:
+        order = order[order >= offset]
+        order.setflags(write=False)
+
+    return order
+
+
 def encryptFence(plain, rails, offset=0):
     """
     Stolen from https://github.com/tothi/railfence.
@@ -41,30 +131,12 @@ def encryptFence(plain, rails, offset=0):
     operations.
     """
 
-    cipher = ""
-
     # offset
     plain = "#" * offset + plain
 
-    length = len(plain)
-    fence = [["#"] * length for _ in range(rails)]
-
-    # build fence
-    rail = 0
-    for x in range(length):
-        fence[rail][x] = plain[x]
-        if rail >= rails - 1:
-            dr = -1
-        elif rail <= 0:
-            dr = 1
-        rail += dr
-
     # read fence
-    for rail in range(rails):
-        for x in range(length):
-            if fence[rail][x] != "#":
-                cipher += fence[rail][x]
-    return cipher
+    order = fenceOrder(len(plain), rails)
+    return "".join([plain[x] for x in order if plain[x] != "#"])
 
 
 def decryptFence(cipher, rails, offset=0):
@@ -74,7 +146,7 @@ def decryptFence(cipher, rails, offset=0):
     This is a convenience function to decrypt data with the Railfence
     cipher.
 
-    :param cipher: The ciphertext as a string.
+    :param cipher: The ciphertext as bytes or a NumPy ``uint8`` array.
 
     :param rails: The integer number of rails to use in the Railfence cipher \
     operations.
@@ -83,38 +155,36 @@ def decryptFence(cipher, rails, offset=0):
     operations.
 
     """
-    plain = ""
 
-    # offset
-    if offset:
-        t = encryptFence("o" * offset + "x" * len(cipher), rails)
-        for i in range(len(t)):
-            if t[i] == "o":
-                cipher = cipher[:i] + b"#" + cipher[i:]
+    plain = decryptFenceSweep(cipher, [rails], offset)[0]
+    return plain.tobytes().decode("latin-1")
 
-    length = len(cipher)
-    fence = [["#"] * length for _ in range(rails)]
 
-    # build fence
-    i = 0
-    for rail in range(rails):
-        p = rail != (rails - 1)
-        x = rail
-        while x < length and i < length:
-            fence[rail][x] = cipher[i]
-            if p:
-                x += 2 * (rails - rail - 1)
-            else:
-                x += 2 * rail
-            if (rail != 0) and (rail != (rails - 1)):
-                p = not p
-            i += 1
+def decryptFenceSweep(cipher, rails, offset=0):
+    """
+    Decrypt data with the Railfence cipher for several rail counts at once.
+    Each rail count does one NumPy scatter into its row of a shared output
+    array.
+
+    :param cipher: The ciphertext as bytes or a NumPy ``uint8`` array.
+
+    :param rails: A sequence of integer rail counts to use in the Railfence \
+    cipher operations.
+
+    :param offset: The integer offset number to use in the Railfence cipher \
+    operations.
+
+    :return: A ``uint8`` NumPy array with one row of plaintext per rail count.
+    """
+
+    cipher = np.frombuffer(cipher, dtype=np.uint8)
+    plain = np.empty((len(rails), len(cipher) + offset), dtype=np.uint8)
+
+    # The offset positions are padding, and did not come from the ciphertext
+    plain[:, :offset] = ord("#")
+    for row, r in zip(plain, rails):
+        row[fenceScatter(len(cipher), r, offset)] = cipher
 
-    # read fence
-    for i in range(length):
-        for rail in range(rails):
-            if fence[rail][i] != "#":
-                plain += chr(fence[rail][i])
     return plain
 
 
@@ -151,6 +221,14 @@ class Unit(NotEnglishAndPrintableUnit, CryptoUnit):
         self.rails = self.geti("rails")
         self.offset = self.geti("offset")
 
+        # Plaintexts already registered. Different rail counts can produce
+        # the same plaintext (e.g. any rail count longer than the data), and
+        # there is no reason to report them twice.
+        self.seen_plaintext = set()
+
+        # The target data as a NumPy array, created on the first evaluation
+        self.cipher = None
+
     def enumerate(self):
 
         # If they do not supply any offset, bruteforce it
@@ -160,14 +238,13 @@ class Unit(NotEnglishAndPrintableUnit, CryptoUnit):
             offsets = [self.offset]
 
         if self.rails is None:
-            rails = range(2, 10)
+            rails = tuple(range(2, 10))
         else:
-            rails = [self.rails]
+            rails = (self.rails,)
 
-        # Now permutate through all of these and run them!
+        # Every rail count is decrypted at once for each offset
         for offset in offsets:
-            for rail in rails:
-                yield (rail, offset)
+            yield (rails, offset)
 
     def evaluate(self, case: Any) -> None:
         """
@@ -176,11 +253,19 @@ class Unit(NotEnglishAndPrintableUnit, CryptoUnit):
         ``offset`` values returned by `enumerate``. 
         
         :param case: A case returned by ``enumerate``. In this case, \
-        it is a tuple containing a rail value and offset value \
-        to be used for the Railfence cipher operations.
+        it is a tuple containing a tuple of rail values and an offset \
+        value to be used for the Railfence cipher operations.
         
         :return: None
         """
 
-        result = decryptFence(self.target.raw, case[0], case[1])
-        self.manager.register_data(self, result)
+        # Wrap the target data once, rather than once per case
+        if self.cipher is None:
+            self.cipher = np.frombuffer(self.target.raw, dtype=np.uint8)
+
+        for plain in decryptFenceSweep(self.cipher, case[0], case[1]):
+            result = plain.tobytes().decode("latin-1")
+
+            if result not in self.seen_plaintext:
+                self.seen_plaintext.add(result)
+                self.manager.register_data(self, result)
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import string
 
+PRINTABLE_BYTES = bytes(string.printable, "ascii")
+
 
 def isprintable(data) -> bool:
     """
@@ -12,7 +14,7 @@ def isprintable(data) -> bool:
     if type(data) is str:
         data = data.encode("utf-8")
     for c in data:
-        if c not in bytes(string.printable, "ascii"):
+        if c not in PRINTABLE_BYTES:
             return False
 
     return True
@@ -20,6 +20,7 @@ dependencies = [
     "base58",
     "pysocks",
     "scipy",
+    "numpy",
     "pydub",
     "matplotlib",
     "pdftotext",
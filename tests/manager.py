@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+from unittest import TestCase
+import time
+
+import regex as re
+
+from katana.manager import _flag_literal
+from katana.unit import Unit
+from tests import KatanaTest
+
+
+class SlowUnit(Unit):
+    """ A unit whose second case is slow to produce a flag. Other threads will
+    drain the generator while that case is still being evaluated. """
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "slow"
+
+    def enumerate(self):
+        yield from range(3)
+
+    def evaluate(self, case):
+        if case == 1:
+            time.sleep(0.3)
+            self.manager.register_data(self, "junk FLAG{found_it} junk")
+
+
+class TestManager(KatanaTest):
+    """ Test katana.manager.Manager scheduling """
+
+    def test_in_flight_batch(self):
+        self.manager["manager"]["threads"] = "4"
+        self.manager["manager"]["recurse"] = "no"
+
+        # Queue the unit by hand, as the finder only knows about real units
+        target = self.manager.target(b"hello slow")
+        target.build_target()
+        self.manager.queue(SlowUnit(self.manager, target))
+        target.building = False
+
+        self.manager.start()
+        self.assertTrue(self.manager.join(timeout=10), "manager timed out")
+        self.assertIn("FLAG{found_it}", [flag[1] for flag in self.monitor.flags])
+
+    def test_find_flag_xml(self):
+        self.assertTrue(
+            self.manager.find_flag(None, b"junk FLAG{<b>xml_flag</b>} junk")
+        )
+        self.assertEqual(self.monitor.flags[0][1], "FLAG{xml_flag}")
+
+
+class TestFlagLiteral(TestCase):
+    """ Test katana.manager._flag_literal """
+
+    # Flag format, expected literal and a flag matching the format
+    FORMATS = [
+        ("FLAG{.*?}", b"{", "flag{lower_case}"),
+        (r"CTF\{.*\}", b"{", "CTF{escaped}"),
+        (r"^CTF\{.*\}", b"", "CTF{anchored}"),
+        ("[Ff]lag{.*?}", b"", "Flag{class}"),
+        ("FL{2}AG{.*}", b"", "FLLAG{quantified}"),
+        ("ab+c-{.*}", b"", "abbbc-{plus}"),
+        ("FLAG-ab+c", b"-", "FLAG-abbc"),
+        ("x{,3}-{.*}", b"", "-{optional}"),
+        ("FLAG{.*?}|CTF{.*?}", b"", "CTF{alternation}"),
+        ("(?i)flag{.*}", b"", "FLAG{inline}"),
+        ("CTF_(?#x)?{.*}", b"", "CTF{comment}"),
+        ("CTF_(?i)?{.*}", b"", "ctf{inline}"),
+        (r"\- (?x)?{.*}", b"", "-{verbose}"),
+        ("x{}y", b"{", "x{}y"),
+        ("k3y-{.*}", b"-{", "K3Y-{digits}"),
+    ]
+
+    def test_flag_literal(self):
+        for flag_format, literal, flag in self.FORMATS:
+            with self.subTest(flag_format=flag_format):
+                self.assertEqual(_flag_literal(flag_format), literal)
+
+                # The literal must be present in any matching flag
+                self.assertIsNotNone(re.search(flag_format, flag, re.IGNORECASE))
+                self.assertIn(literal, flag.encode("utf-8"))
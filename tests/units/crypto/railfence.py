@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+from tests import KatanaTest
+
+
+class TestRailfence(KatanaTest):
+    """ Test katana.units.crypto.railfence """
+
+    def test_railfence(self):
+        self.katana_test(
+            config=r"""
+        [manager]
+        flag-format=FLAG{.*?}
+        units=railfence
+        auto=yes
+        """,
+            target=b"F{lcsnLGrifnei_u}Aae_f",
+            correct_flag="FLAG{railfence_is_fun}",
+        )
+
+    def test_railfence_offset(self):
+        self.katana_test(
+            config=r"""
+        [manager]
+        flag-format=FLAG{.*?}
+        units=railfence
+        auto=yes
+        """,
+            target=b"{esGrfni_}FAalc_fnLieu",
+            correct_flag="FLAG{railfence_is_fun}",
+        )